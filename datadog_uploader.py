@@ -5,16 +5,79 @@ This module provides functionality to upload FOCUS-compliant cost data
 to Datadog's Custom Costs API. It can be used by any SaaS cost provider.
 """
 
+import io
 import os
 import logging
-from typing import List, Dict
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple
 import requests
 import json
 
-logger = logging.getLogger(__name__)
+from http_client import PooledSessionClient, build_session
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
+logger = logging.getLogger(__name__)
 
-class DatadogCostUploader:
+# Records per uploaded file, and concurrent uploads when a payload is split
+UPLOAD_CHUNK_SIZE = 5000
+UPLOAD_WORKERS = 4
+
+# Fields Datadog requires on every Custom Costs record
+REQUIRED_FOCUS_FIELDS = frozenset({
+    "ProviderName",
+    "ChargeDescription",
+    "ChargePeriodStart",
+    "ChargePeriodEnd",
+    "BilledCost",
+    "BillingCurrency"
+})
+
+
+def _dumps(data) -> bytes:
+    """Serialize data to compact JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def _multipart_json_body(filename: str, records: List[Dict]) -> Tuple[io.BytesIO, str]:
+    """
+    Build a multipart/form-data body carrying records as a JSON array file.
+
+    Records are serialized one at a time straight into the body buffer, so the
+    payload exists once in memory rather than as a serialized JSON blob plus a
+    second copy inside the encoded request body.
+
+    Args:
+        filename: File name Datadog will see for the upload
+        records: Cost records to serialize
+
+    Returns:
+        Tuple of (body buffer positioned at start, Content-Type header value)
+    """
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    body.write(
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f'Content-Type: application/json\r\n\r\n'.encode("utf-8")
+    )
+    body.write(b"[")
+    for index, record in enumerate(records):
+        if index:
+            body.write(b",")
+        body.write(_dumps(record))
+    body.write(f"]\r\n--{boundary}--\r\n".encode("utf-8"))
+    body.seek(0)
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+class DatadogCostUploader(PooledSessionClient):
     """Upload cost data to Datadog Custom Costs API."""
 
     def __init__(self, api_key: str = None, app_key: str = None):
@@ -29,16 +92,28 @@ class DatadogCostUploader:
         self.app_key = app_key or os.getenv("DD_APP_KEY")
         self.api_url = "https://api.datadoghq.com"
 
+        # Reuse pooled connections to the Datadog API across uploads (parts upload concurrently)
+        self.session = build_session(
+            {
+                "DD-API-KEY": self.api_key,
+                "DD-APPLICATION-KEY": self.app_key
+            },
+            allowed_methods=["PUT"],
+            pool_maxsize=UPLOAD_WORKERS
+        )
+
         if not self.api_key or not self.app_key:
             logger.warning("Datadog credentials not found. Set DD_API_KEY and DD_APP_KEY environment variables.")
 
-    def upload_costs(self, cost_data: List[Dict], provider_name: str = None) -> bool:
+    def upload_costs(self, cost_data: List[Dict], provider_name: str = None, batch: int = None) -> bool:
         """
         Upload cost data to Datadog Custom Costs API.
 
         Args:
             cost_data: List of cost records in FOCUS format
             provider_name: Optional provider name for logging
+            batch: Optional batch number when a run uploads in several calls;
+                   keeps each batch's file name distinct
 
         Returns:
             bool: True if upload successful, False otherwise
@@ -51,44 +126,79 @@ class DatadogCostUploader:
             logger.warning("No cost data to upload")
             return False
 
-        provider_info = f" from {provider_name}" if provider_name else ""
-        logger.info(f"Uploading {len(cost_data)} cost records{provider_info} to Datadog...")
+        # Reject malformed payloads before serializing and uploading
+        if not all(self.validate_focus_format(record) for record in cost_data):
+            logger.error("Cannot upload: cost data contains records missing required fields")
+            return False
 
-        # Extract date range from cost data for filename
-        start_dates = [record.get("ChargePeriodStart") for record in cost_data if record.get("ChargePeriodStart")]
-        end_dates = [record.get("ChargePeriodEnd") for record in cost_data if record.get("ChargePeriodEnd")]
+        provider_info = f" from {provider_name}" if provider_name else ""
+        logger.info("Uploading %d cost records%s to Datadog...", len(cost_data), provider_info)
+
+        # Extract date range from cost data for filename (single pass)
+        earliest_start = latest_end = None
+        for record in cost_data:
+            start = record.get("ChargePeriodStart")
+            end = record.get("ChargePeriodEnd")
+            if start and (earliest_start is None or start < earliest_start):
+                earliest_start = start
+            if end and (latest_end is None or end > latest_end):
+                latest_end = end
 
         date_range = ""
-        if start_dates and end_dates:
-            earliest_start = min(start_dates)
-            latest_end = max(end_dates)
+        if earliest_start and latest_end:
             if earliest_start == latest_end:
                 date_range = f"_{earliest_start}"
             else:
                 date_range = f"_{earliest_start}_to_{latest_end}"
 
-        # Create temporary JSON file for upload
-        temp_filename = f"{provider_name or 'data'}{date_range}.json"
-        logger.info(f"Creating upload file: {temp_filename}")
+        base_filename = f"{provider_name or 'data'}{date_range}"
+        if batch is not None:
+            base_filename += f"_batch{batch}"
+
+        # Large payloads are split into parts that upload concurrently over the
+        # shared session. Part 1 keeps the unsuffixed name, so a period keeps
+        # the same first file however many records it has
+        uploads = [
+            (f"{base_filename}_part{part}.json" if part > 1 else f"{base_filename}.json",
+             cost_data[offset:offset + UPLOAD_CHUNK_SIZE])
+            for part, offset in enumerate(range(0, len(cost_data), UPLOAD_CHUNK_SIZE), start=1)
+        ]
+        if len(uploads) == 1:
+            success = self._upload_file(*uploads[0])
+        else:
+            logger.info("Splitting upload into %d files of up to %d records", len(uploads), UPLOAD_CHUNK_SIZE)
+            with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+                results = list(executor.map(lambda upload: self._upload_file(*upload), uploads))
+            success = all(results)
+            if not success:
+                logger.error("%d of %d upload files failed", results.count(False), len(results))
+
+        if success:
+            logger.info("Cost data will appear in Datadog Cloud Cost Management within 24-48 hours")
+        return success
+
+    def _upload_file(self, upload_filename: str, records: List[Dict]) -> bool:
+        """
+        Upload one batch of records to Datadog as a named JSON file.
+
+        Args:
+            upload_filename: File name Datadog will see for the upload
+            records: Cost records in FOCUS format
+
+        Returns:
+            bool: True if upload successful, False otherwise
+        """
+        logger.info("Preparing upload file: %s", upload_filename)
         try:
-            # Write data to temporary file
-            with open(temp_filename, 'w') as f:
-                json.dump(cost_data, f, indent=2)
+            # Serialize in memory and upload as a named JSON file
+            body, content_type = _multipart_json_body(upload_filename, records)
 
             # Upload to Datadog
             url = f"{self.api_url}/api/v2/cost/custom_costs"
-            headers = {
-                "DD-API-KEY": self.api_key,
-                "DD-APPLICATION-KEY": self.app_key
-            }
+            response = self.session.put(url, data=body, headers={"Content-Type": content_type})
+            response.raise_for_status()
 
-            with open(temp_filename, 'rb') as f:
-                files = {'file': (temp_filename, f, 'application/json')}
-                response = requests.put(url, headers=headers, files=files)
-                response.raise_for_status()
-
-            logger.info(f"Successfully uploaded {len(cost_data)} cost records to Datadog")
-            logger.info("Cost data will appear in Datadog Cloud Cost Management within 24-48 hours")
+            logger.info("Successfully uploaded %d cost records to Datadog (%s)", len(records), upload_filename)
             return True
 
         except requests.exceptions.HTTPError as e:
@@ -97,23 +207,17 @@ class DatadogCostUploader:
             elif e.response.status_code == 403:
                 logger.error("Forbidden. Check your DD_APPLICATION_KEY permissions.")
             else:
-                logger.error(f"Upload failed with status {e.response.status_code}: {e.response.text}")
+                logger.error("Upload of %s failed with status %s: %s", upload_filename, e.response.status_code, e.response.text)
             return False
 
         except requests.exceptions.RequestException as e:
-            logger.error(f"Upload request failed: {e}")
+            logger.error("Upload request for %s failed: %s", upload_filename, e)
             return False
 
         except Exception as e:
-            logger.error(f"Failed to upload costs: {e}")
+            logger.error("Failed to upload %s: %s", upload_filename, e)
             return False
 
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_filename):
-                os.remove(temp_filename)
-                logger.debug(f"Cleaned up temporary file: {temp_filename}")
-
     def validate_focus_format(self, cost_record: Dict) -> bool:
         """
         Validate a cost record matches FOCUS/Datadog Custom Costs format.
@@ -132,18 +236,9 @@ class DatadogCostUploader:
         Returns:
             bool: True if valid, False otherwise
         """
-        required_fields = [
-            "ProviderName",
-            "ChargeDescription",
-            "ChargePeriodStart",
-            "ChargePeriodEnd",
-            "BilledCost",
-            "BillingCurrency"
-        ]
-
-        for field in required_fields:
-            if field not in cost_record:
-                logger.error(f"Missing required field: {field}")
-                return False
+        missing = REQUIRED_FOCUS_FIELDS - cost_record.keys()
+        if missing:
+            logger.error("Missing required fields: %s", ", ".join(sorted(missing)))
+            return False
 
         return True
@@ -10,13 +10,21 @@ import os
 import sys
 import argparse
 import json
-from datetime import datetime, timedelta
-from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import date, datetime, timedelta
 import requests
 from typing import Dict, List, Optional
 import logging
 
 from datadog_uploader import DatadogCostUploader
+from http_client import PooledSessionClient, build_session, env_int
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
 
 # Set up logging
 logging.basicConfig(
@@ -25,8 +33,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Default concurrent repository metadata lookups (I/O-bound, share the session
+# pool); tunable with GITHUB_METADATA_WORKERS
+METADATA_WORKERS = 16
+
 
-class GitHubCostFetcher:
+class GitHubCostFetcher(PooledSessionClient):
     """Fetch and convert GitHub billing data to FOCUS format."""
 
     def __init__(self, github_token: str = None, org_name: str = None):
@@ -50,6 +62,24 @@ class GitHubCostFetcher:
             raise ValueError("GitHub organization required. Set GITHUB_ORG environment variable.")
 
         self.base_url = "https://api.github.com"
+
+        # Concurrent repository metadata lookups
+        self.metadata_workers = env_int("GITHUB_METADATA_WORKERS", METADATA_WORKERS, minimum=1)
+
+        # Repository metadata keyed by repository name (see get_repository_metadata)
+        self._repo_cache: Dict[str, Dict] = {}
+
+        # Reuse pooled, keep-alive connections to api.github.com across all calls
+        self.session = build_session(
+            {
+                "Accept": "application/vnd.github+json",
+                "Authorization": f"Bearer {self.token}",
+                "X-GitHub-Api-Version": "2022-11-28"
+            },
+            allowed_methods=["GET"],
+            pool_maxsize=self.metadata_workers
+        )
+
         logger.info(f"Initialized GitHub cost fetcher for organization: {self.org}")
 
     def fetch_billing_data(self, year: int, month: int = None, day: int = None) -> List[Dict]:
@@ -65,11 +95,6 @@ class GitHubCostFetcher:
             List of usage items from GitHub API
         """
         url = f"{self.base_url}/orgs/{self.org}/settings/billing/usage"
-        headers = {
-            "Accept": "application/vnd.github+json",
-            "Authorization": f"Bearer {self.token}",
-            "X-GitHub-Api-Version": "2022-11-28"
-        }
         params = {"year": year}
         if month:
             params["month"] = month
@@ -84,9 +109,9 @@ class GitHubCostFetcher:
         logger.info(f"Fetching GitHub billing data for {date_str}")
 
         try:
-            response = requests.get(url, headers=headers, params=params)
+            response = self.session.get(url, params=params)
             response.raise_for_status()
-            data = response.json()
+            data = _loads(response.content)
             usage_items = data.get("usageItems", [])
             logger.info(f"Retrieved {len(usage_items)} usage items from GitHub")
             return usage_items
@@ -103,60 +128,118 @@ class GitHubCostFetcher:
             logger.error(f"Request failed: {e}")
             raise
 
+    def fetch_billing_data_range(self, start_date: datetime, end_date: datetime) -> List[Dict]:
+        """
+        Fetch billing data for an inclusive date range.
+
+        Issues one monthly request per calendar month in the range and filters
+        usage items by their date client-side, instead of one request per day.
+
+        Args:
+            start_date: First day of the range
+            end_date: Last day of the range (inclusive)
+
+        Returns:
+            List of usage items dated within the range
+        """
+        first_day = start_date.date().isoformat()
+        last_day = end_date.date().isoformat()
+        usage_items = []
+
+        year, month = start_date.year, start_date.month
+        while (year, month) <= (end_date.year, end_date.month):
+            for item in self.fetch_billing_data(year=year, month=month):
+                if first_day <= item.get("date", "")[:10] <= last_day:
+                    usage_items.append(item)
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+        logger.info(f"Retrieved {len(usage_items)} usage items between {first_day} and {last_day}")
+        return usage_items
+
     def get_repository_metadata(self, repository_name: str) -> Dict:
         """
         Fetch repository metadata including topics.
 
+        Results are cached per repository, so repeated lookups for the
+        same repository only hit the API once.
+
         Args:
             repository_name: Name of the repository
 
         Returns:
-            Repository metadata dict with topics
+            Repository metadata dict with topics, plus "service_tag" holding the
+            name from the repository's service-* topic (None if it has none)
         """
+        if repository_name in self._repo_cache:
+            return self._repo_cache[repository_name]
+
         url = f"{self.base_url}/repos/{self.org}/{repository_name}"
-        headers = {
-            "Accept": "application/vnd.github+json",
-            "Authorization": f"Bearer {self.token}",
-            "X-GitHub-Api-Version": "2022-11-28"
-        }
 
         try:
-            response = requests.get(url, headers=headers)
+            response = self.session.get(url)
             response.raise_for_status()
-            data = response.json()
-            topics = data.get("topics", [])
+            data = _loads(response.content)
+            # Resolve the service-* topic once per repository so conversion
+            # is a single lookup; GitHub topics use format: service-<name>
+            data["service_tag"] = next(
+                (t.removeprefix("service-") for t in data.get("topics", []) if t.startswith("service-")),
+                None
+            )
 
             # Log service topic detection
-            service_topics = [t for t in topics if t.startswith("service-")]
-            if service_topics:
-                logger.info(f"Repository '{repository_name}' has service topic: {service_topics[0]}")
+            if data["service_tag"]:
+                logger.info("Repository '%s' has service topic: service-%s", repository_name, data["service_tag"])
             else:
-                logger.debug(f"Repository '{repository_name}' has no service topic, using repo name")
+                logger.debug("Repository '%s' has no service topic, using repo name", repository_name)
 
+            self._repo_cache[repository_name] = data
             return data
         except requests.exceptions.HTTPError as e:
-            logger.warning(f"Failed to fetch metadata for '{repository_name}': HTTP {e.response.status_code}")
+            logger.warning("Failed to fetch metadata for '%s': HTTP %s", repository_name, e.response.status_code)
             return {}
-        except requests.exceptions.RequestException as e:
-            logger.warning(f"Failed to fetch metadata for '{repository_name}': {e}")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # ValueError covers an undecodable body; one bad lookup must not fail the run
+            logger.warning("Failed to fetch metadata for '%s': %s", repository_name, e)
+            return {}
+
+    def fetch_repositories_metadata(self, usage_items: List[Dict]) -> Dict[str, Dict]:
+        """
+        Fetch metadata for every repository referenced by the usage items.
+
+        Lookups run concurrently since each one is an independent GET.
+
+        Args:
+            usage_items: GitHub API usage items
+
+        Returns:
+            Dictionary mapping repository name to its metadata
+        """
+        repositories = sorted({
+            item["repositoryName"] for item in usage_items if item.get("repositoryName")
+        })
+        if not repositories:
             return {}
 
-    def convert_to_focus(self, usage_item: Dict, billing_start: datetime, billing_end: datetime) -> Dict:
+        logger.info(f"Fetching metadata for {len(repositories)} repositories")
+        with ThreadPoolExecutor(max_workers=self.metadata_workers) as executor:
+            metadata = executor.map(self.get_repository_metadata, repositories)
+            return dict(zip(repositories, metadata))
+
+    def convert_to_focus(self, usage_item: Dict, charge_period_start: str, charge_period_end: str,
+                         repo_metadata_cache: Dict[str, Dict]) -> Dict:
         """
         Convert GitHub usage item to Datadog Custom Costs (FOCUS) format.
 
         Args:
             usage_item: GitHub API usage item
-            billing_start: Charge period start date
-            billing_end: Charge period end date
+            charge_period_start: Charge period start date (YYYY-MM-DD)
+            charge_period_end: Charge period end date (YYYY-MM-DD)
+            repo_metadata_cache: Repository metadata keyed by repository name
+                                 (from fetch_repositories_metadata)
 
         Returns:
             Cost record in FOCUS format
         """
-        # Format timestamps in YYYY-MM-DD format (Datadog requirement)
-        charge_period_start = billing_start.strftime("%Y-%m-%d")
-        charge_period_end = billing_end.strftime("%Y-%m-%d")
-
         # Extract fields from GitHub API
         product = usage_item.get("product", "Unknown")
         sku = usage_item.get("sku", "Unknown")
@@ -166,43 +249,17 @@ class GitHubCostFetcher:
         price_per_unit = usage_item.get("pricePerUnit", 0)
         net_amount = usage_item.get("netAmount", 0)
 
-        # Calculate cost
-        billed_cost = Decimal(str(quantity)) * Decimal(str(price_per_unit))
-
-        # Build FOCUS record
-        focus_record = {
-            "ProviderName": "GitHub",
-            "ChargeDescription": product,
-            "ChargePeriodStart": charge_period_start,
-            "ChargePeriodEnd": charge_period_end,
-            "BilledCost": float(billed_cost),
-            "BillingCurrency": "USD",
-            "Tags": {}
-        }
-
         # Add tags for cost attribution
-        tags = focus_record["Tags"]
-        tags["sku"] = sku
+        tags = {"sku": sku}
 
         if repository:
             tags["repository"] = repository
 
-            # Try to determine service:
-            # 1. Check for service-* topic (override)
+            # Determine service:
+            # 1. service-* topic (override, resolved in get_repository_metadata)
             # 2. Default to repository name
-            service = repository  # Default
-
-            # Fetch repo metadata to check for service topic
-            # GitHub topics use format: service-<name> (lowercase, hyphens only)
-            repo_metadata = self.get_repository_metadata(repository)
-            topics = repo_metadata.get("topics", [])
-
-            for topic in topics:
-                if topic.startswith("service-"):
-                    service = topic[8:]  # Remove "service-" prefix
-                    break
-
-            tags["service"] = service
+            service_tag = repo_metadata_cache.get(repository, {}).get("service_tag")
+            tags["service"] = service_tag or repository
         if unit_type:
             tags["unit_type"] = unit_type
         if quantity:
@@ -212,7 +269,16 @@ class GitHubCostFetcher:
         if net_amount:
             tags["net_amount"] = str(net_amount)
 
-        return focus_record
+        # Build FOCUS record
+        return {
+            "ProviderName": "GitHub",
+            "ChargeDescription": product,
+            "ChargePeriodStart": charge_period_start,
+            "ChargePeriodEnd": charge_period_end,
+            "BilledCost": float(quantity) * float(price_per_unit),
+            "BillingCurrency": "USD",
+            "Tags": tags
+        }
 
 
 def main():
@@ -233,6 +299,9 @@ Examples:
 
   # Fetch data for entire month
   python github_costs.py --year 2025 --month 12
+
+  # Backfill a date range (one API call per month, each item charged to its own date)
+  python github_costs.py --start-date 2025-12-01 --end-date 2025-12-22
         '''
     )
 
@@ -240,87 +309,118 @@ Examples:
     parser.add_argument('--year', type=int, help='Year to fetch')
     parser.add_argument('--month', type=int, help='Month to fetch (1-12)')
     parser.add_argument('--day', type=int, help='Day to fetch (1-31)')
+    parser.add_argument('--start-date', type=str, help='Start of date range to fetch in YYYY-MM-DD format (requires --end-date)')
+    parser.add_argument('--end-date', type=str, help='End of date range to fetch in YYYY-MM-DD format, inclusive (requires --start-date)')
     parser.add_argument('--dry-run', action='store_true',
                        help='Fetch and calculate costs without uploading to Datadog')
 
     args = parser.parse_args()
 
+    if bool(args.start_date) != bool(args.end_date):
+        parser.error('--start-date and --end-date must be used together')
+    if args.start_date and (args.date or args.year or args.month or args.day):
+        parser.error('--start-date/--end-date cannot be combined with --date, --year, --month or --day')
+
     try:
-        # Initialize fetcher
-        fetcher = GitHubCostFetcher()
-
-        # Initialize uploader (only needed for non-dry-run)
-        if not args.dry_run:
-            uploader = DatadogCostUploader()
-
-        # Determine date to fetch
-        if args.date:
-            target_date = datetime.strptime(args.date, '%Y-%m-%d')
-            year = target_date.year
-            month = target_date.month
-            day = target_date.day
-        elif args.year:
-            year = args.year
-            month = args.month
-            day = args.day
-        else:
-            # Default to yesterday (to capture complete 24-hour period)
-            yesterday = datetime.now() - timedelta(days=1)
-            year = yesterday.year
-            month = yesterday.month
-            day = yesterday.day
-
-        # Fetch billing data from GitHub
-        usage_data = fetcher.fetch_billing_data(year=year, month=month, day=day)
-
-        if not usage_data:
-            logger.warning("No billing data found for the specified date")
-            return
-
-        # Set charge period (same date for both start and end to prevent spreading)
-        if day:
-            billing_start = datetime(year, month, day)
-            billing_end = datetime(year, month, day)
-        elif month:
-            billing_start = datetime(year, month, 1)
-            billing_end = datetime(year, month, 1)
-        else:
-            billing_start = datetime(year, 1, 1)
-            billing_end = datetime(year, 1, 1)
-
-        # Convert to FOCUS format
-        focus_data = [
-            fetcher.convert_to_focus(item, billing_start, billing_end)
-            for item in usage_data
-        ]
-
-        logger.info(f"Converted {len(focus_data)} GitHub usage items to FOCUS format")
-
-        # Handle dry-run mode
-        if args.dry_run:
-            logger.info("DRY RUN MODE - Not uploading to Datadog")
-            print("\n" + "="*80)
-            print("FOCUS COST RECORDS (would be uploaded to Datadog):")
-            print("="*80)
-            print(json.dumps(focus_data, indent=2))
-            print("="*80)
-
-            total_cost = sum(record["BilledCost"] for record in focus_data)
-            print(f"\nTotal cost: ${total_cost:.4f}")
-            print(f"FOCUS records generated: {len(focus_data)}")
-            print(f"Usage items processed: {len(usage_data)}")
-            logger.info("Dry run completed successfully")
-            sys.exit(0)
-
-        # Upload to Datadog
-        success = uploader.upload_costs(focus_data, provider_name="GitHub")
-
-        if success:
-            logger.info("GitHub cost data successfully uploaded to Datadog")
-            sys.exit(0)
-        else:
-            logger.error("Failed to upload GitHub cost data to Datadog")
-            sys.exit(1)
+        # Clients close their pooled connections when the run ends
+        with ExitStack() as clients:
+            # Initialize fetcher
+            fetcher = clients.enter_context(GitHubCostFetcher())
+
+            # Initialize uploader (only needed for non-dry-run)
+            if not args.dry_run:
+                uploader = clients.enter_context(DatadogCostUploader())
+
+            # Determine date(s) to fetch
+            if args.start_date:
+                start_date = datetime.strptime(args.start_date, '%Y-%m-%d')
+                end_date = datetime.strptime(args.end_date, '%Y-%m-%d')
+                if end_date < start_date:
+                    raise ValueError("--end-date must not be before --start-date")
+            elif args.date:
+                target_date = datetime.strptime(args.date, '%Y-%m-%d')
+                year = target_date.year
+                month = target_date.month
+                day = target_date.day
+            elif args.year:
+                year = args.year
+                month = args.month
+                day = args.day
+            else:
+                # Default to yesterday (to capture complete 24-hour period)
+                yesterday = datetime.now() - timedelta(days=1)
+                year = yesterday.year
+                month = yesterday.month
+                day = yesterday.day
+
+            # Fetch billing data from GitHub
+            if args.start_date:
+                usage_data = fetcher.fetch_billing_data_range(start_date, end_date)
+            else:
+                usage_data = fetcher.fetch_billing_data(year=year, month=month, day=day)
+
+            if not usage_data:
+                logger.warning("No billing data found for the specified date")
+                return
+
+            # Fetch repository metadata (service topics) once per repository
+            repo_metadata_cache = fetcher.fetch_repositories_metadata(usage_data)
+
+            # Convert to FOCUS format
+            if args.start_date:
+                # Date range: charge each usage item to its own day
+                focus_data = [
+                    fetcher.convert_to_focus(item, item["date"][:10], item["date"][:10], repo_metadata_cache)
+                    for item in usage_data
+                ]
+            else:
+                # Set charge period (same date for both start and end to prevent spreading)
+                if day:
+                    billing_start = date(year, month, day)
+                    billing_end = date(year, month, day)
+                elif month:
+                    billing_start = date(year, month, 1)
+                    billing_end = date(year, month, 1)
+                else:
+                    billing_start = date(year, 1, 1)
+                    billing_end = date(year, 1, 1)
+
+                # Format charge period in YYYY-MM-DD format (Datadog requirement)
+                charge_period_start = billing_start.isoformat()
+                charge_period_end = billing_end.isoformat()
+
+                focus_data = [
+                    fetcher.convert_to_focus(item, charge_period_start, charge_period_end, repo_metadata_cache)
+                    for item in usage_data
+                ]
+
+            logger.info(f"Converted {len(focus_data)} GitHub usage items to FOCUS format")
+
+            # Handle dry-run mode
+            if args.dry_run:
+                logger.info("DRY RUN MODE - Not uploading to Datadog")
+                print("\n" + "="*80)
+                print("FOCUS COST RECORDS (would be uploaded to Datadog):")
+                print("="*80)
+                print(json.dumps(focus_data, indent=2))
+                print("="*80)
+
+                total_cost = sum(record["BilledCost"] for record in focus_data)
+                print(f"\nTotal cost: ${total_cost:.4f}")
+                print(f"FOCUS records generated: {len(focus_data)}")
+                print(f"Usage items processed: {len(usage_data)}")
+                logger.info("Dry run completed successfully")
+                sys.exit(0)
+
+            # Upload to Datadog
+            success = uploader.upload_costs(focus_data, provider_name="GitHub")
+
+            if success:
+                logger.info("GitHub cost data successfully uploaded to Datadog")
+                sys.exit(0)
+            else:
+                logger.error("Failed to upload GitHub cost data to Datadog")
+                sys.exit(1)
 
     except Exception as e:
         logger.error(f"GitHub cost processing failed: {e}")
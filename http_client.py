@@ -0,0 +1,113 @@
+"""
+Shared HTTP client helpers for the cost provider integrations.
+
+Provides a pooled, retrying requests.Session, a base class that lets API
+clients release their connections as context managers, and validated
+integer settings from the environment.
+"""
+
+import os
+import logging
+from typing import Dict, List
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait on connect/read for each request, unless a call passes its own
+DEFAULT_TIMEOUT = 30
+
+
+def env_int(name: str, default: int, minimum: int = 1, maximum: int = None) -> int:
+    """
+    Read an integer setting from the environment, clamped to [minimum, maximum].
+
+    Args:
+        name: Environment variable name
+        default: Value to use when the variable is unset or empty
+        minimum: Smallest allowed value
+        maximum: Optional largest allowed value
+
+    Returns:
+        The configured value, clamped to the allowed range
+
+    Raises:
+        ValueError: If the variable is set but not an integer
+    """
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {raw!r}") from None
+
+    clamped = max(minimum, value if maximum is None else min(maximum, value))
+    if clamped != value:
+        logger.warning("%s=%d is out of range, using %d", name, value, clamped)
+    return clamped
+
+
+class _TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies a default timeout to requests sent without one."""
+
+    def __init__(self, *args, timeout: float = DEFAULT_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        return super().send(request, timeout=self.timeout if timeout is None else timeout, **kwargs)
+
+
+def build_session(headers: Dict[str, str], allowed_methods: List[str], pool_maxsize: int = 10,
+                  backoff_factor: float = 1.0, timeout: float = DEFAULT_TIMEOUT) -> requests.Session:
+    """
+    Build a requests.Session with pooled keep-alive connections and retries.
+
+    Rate limits (429) and transient server errors are retried at the transport
+    layer with exponential backoff, honouring Retry-After; the final response
+    is still surfaced through raise_for_status(). Every request gets a timeout,
+    so a stalled connection raises instead of hanging the job.
+
+    Args:
+        headers: Headers sent with every request
+        allowed_methods: HTTP methods that may be retried
+        pool_maxsize: Maximum pooled connections (match the caller's concurrency)
+        backoff_factor: Exponential backoff factor between retries, in seconds
+        timeout: Default connect/read timeout per request, in seconds
+
+    Returns:
+        Configured session
+    """
+    session = requests.Session()
+    session.headers.update(headers)
+    retry = Retry(
+        total=5,
+        backoff_factor=backoff_factor,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=allowed_methods,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    # Each session talks to a single host, so one connection pool is enough
+    session.mount("https://", _TimeoutHTTPAdapter(
+        pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry, timeout=timeout
+    ))
+    return session
+
+
+class PooledSessionClient:
+    """Base for API clients holding a pooled ``self.session``; usable as a context manager."""
+
+    session: requests.Session
+
+    def close(self):
+        """Release pooled HTTP connections."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -14,13 +14,22 @@ import sys
 import argparse
 import calendar
 import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from datetime import datetime, timedelta
-from decimal import Decimal
 import requests
-from typing import Dict, List
+from typing import Dict, List, Optional
 import logging
 
 from datadog_uploader import DatadogCostUploader
+from http_client import PooledSessionClient, build_session, env_int
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    orjson = None
+    _loads = json.loads
 
 # Set up logging
 logging.basicConfig(
@@ -30,17 +39,77 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Neon Scale Plan Pricing (Feb 2026+)
+COMPUTE_PER_CU_HOUR = 0.222                # $0.222 per CU-hour
+STORAGE_PER_GB_MONTH = 0.35                # $0.35 per GB-month
+DATA_TRANSFER_PER_GB = 0.10                # $0.10 per GB (public egress)
+DATA_TRANSFER_FREE_GB_PER_PROJECT = 100.0  # 100 GB free per project per month
+BRANCH_PER_MONTH = 1.50                    # $1.50 per branch-month
+INSTANT_RESTORE_PER_GB_MONTH = 0.20        # $0.20 per GB-month
+
+BYTES_PER_GB = float(1 << 30)              # Neon bills in binary gigabytes
+
 PRICING = {
-    "compute_per_cu_hour": Decimal("0.222"),              # $0.222 per CU-hour
-    "storage_per_gb_month": Decimal("0.35"),              # $0.35 per GB-month
-    "data_transfer_per_gb": Decimal("0.10"),              # $0.10 per GB (public egress)
-    "data_transfer_free_gb_per_project": Decimal("100"),  # 100 GB free per project per month
-    "branch_per_month": Decimal("1.50"),                  # $1.50 per branch-month
-    "instant_restore_per_gb_month": Decimal("0.20"),      # $0.20 per GB-month
+    "compute_per_cu_hour": COMPUTE_PER_CU_HOUR,
+    "storage_per_gb_month": STORAGE_PER_GB_MONTH,
+    "data_transfer_per_gb": DATA_TRANSFER_PER_GB,
+    "data_transfer_free_gb_per_project": DATA_TRANSFER_FREE_GB_PER_PROJECT,
+    "branch_per_month": BRANCH_PER_MONTH,
+    "instant_restore_per_gb_month": INSTANT_RESTORE_PER_GB_MONTH,
 }
 
+# Rate tag values, formatted once rather than per record
+COMPUTE_RATE_TAG = str(COMPUTE_PER_CU_HOUR)
+STORAGE_RATE_TAG = str(STORAGE_PER_GB_MONTH)
+DATA_TRANSFER_RATE_TAG = str(DATA_TRANSFER_PER_GB)
+
+# Fields shared by every Neon FOCUS record; per-record fields are filled in
+# (placeholders keep the key order stable in the output)
+FOCUS_RECORD_TEMPLATE = {
+    "ProviderName": "Neon",
+    "ChargeDescription": None,
+    "ChargePeriodStart": None,
+    "ChargePeriodEnd": None,
+    "BilledCost": None,
+    "BillingCurrency": "USD",
+    "Tags": None,
+}
+
+# Page sizes: /projects allows up to 400 per page (tunable with NEON_PAGE_LIMIT),
+# consumption history up to 100
+PROJECT_PAGE_LIMIT = 400
+CONSUMPTION_PAGE_LIMIT = 100
+
+# FOCUS records per Datadog upload, so large orgs never hold every record at once
+UPLOAD_BATCH_SIZE = 500
+
+# On-disk cache for the project id -> name map, which rarely changes
+PROJECT_CACHE_DIR = os.path.expanduser(os.getenv("NEON_CACHE_DIR", "~/.cache/neon_costs"))
+PROJECT_CACHE_TTL = timedelta(hours=24)
 
-class NeonCostFetcher:
+
+def _write_json_indented(data, stream=None):
+    """
+    Write data to a text stream as indented JSON followed by a newline.
+
+    orjson output goes straight to the underlying byte buffer, skipping a
+    decoded str copy; the stdlib fallback encodes incrementally as it writes.
+
+    Args:
+        data: JSON-serializable data
+        stream: Text stream to write to (defaults to sys.stdout)
+    """
+    stream = stream or sys.stdout
+    buffer = getattr(stream, "buffer", None)
+    if orjson is not None and buffer is not None:
+        stream.flush()
+        buffer.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
+        buffer.flush()
+    else:
+        json.dump(data, stream, indent=2)
+        stream.write("\n")
+
+
+class NeonCostFetcher(PooledSessionClient):
     """Fetch and convert Neon database consumption data to FOCUS format."""
 
     def __init__(self, api_key: str = None, org_id: str = None):
@@ -63,40 +132,175 @@ class NeonCostFetcher:
             logger.error("Neon org ID not found. Set NEON_ORG_ID environment variable.")
             raise ValueError("Neon organization ID required. Set NEON_ORG_ID environment variable.")
 
+        # Page size for /projects metadata requests, clamped to the API maximum
+        self.project_page_limit = env_int("NEON_PAGE_LIMIT", PROJECT_PAGE_LIMIT, minimum=1, maximum=PROJECT_PAGE_LIMIT)
+
         self.base_url = "https://console.neon.tech/api/v2"
+        self.project_metadata_from_cache = False
+        # Project name map already fetched in this process, if any
+        self._project_map = None
+
+        # Reuse pooled keep-alive connections to console.neon.tech across all calls
+        self.session = build_session(
+            {
+                "Accept": "application/json",
+                "Authorization": f"Bearer {self.api_key}"
+            },
+            allowed_methods=["GET"],
+            pool_maxsize=16,
+            backoff_factor=0.5
+        )
+
         logger.info(f"Initialized Neon cost fetcher for organization: {self.org_id}")
 
-    def fetch_project_metadata(self) -> Dict[str, str]:
+    def _project_cache_path(self) -> str:
+        """Path of the on-disk project name cache for this organization."""
+        return os.path.join(PROJECT_CACHE_DIR, f"projects_{self.org_id}.json")
+
+    def _load_project_cache(self) -> Optional[Dict]:
+        """
+        Load the cached project metadata entry from disk.
+
+        Returns:
+            Cache entry with "projects" (project_id -> project_name), "fetched_at"
+            (datetime) and optional "etag"/"last_modified" validators, or None
+            if missing or unreadable
+        """
+        try:
+            with open(self._project_cache_path()) as f:
+                cached = json.load(f)
+            if cached.get("org_id") != self.org_id or not isinstance(cached.get("projects"), dict):
+                return None
+            cached["fetched_at"] = datetime.fromisoformat(cached["fetched_at"])
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+        return cached
+
+    def _save_project_cache(self, project_map: Dict[str, str], etag: str = None, last_modified: str = None):
+        """
+        Atomically write the project name map to the on-disk cache.
+
+        Args:
+            project_map: project_id -> project_name map to cache
+            etag: ETag response header, for conditional requests next time
+            last_modified: Last-Modified response header, for conditional requests next time
+        """
+        path = self._project_cache_path()
+        temp_path = f"{path}.tmp"
+        try:
+            os.makedirs(PROJECT_CACHE_DIR, exist_ok=True)
+            with open(temp_path, "w") as f:
+                json.dump({
+                    "fetched_at": datetime.now().isoformat(),
+                    "org_id": self.org_id,
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "projects": project_map
+                }, f)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write project metadata cache {path}: {e}")
+
+    def fetch_project_metadata(self, use_cache: bool = True) -> Dict[str, str]:
         """
         Fetch all projects metadata to get project names.
 
+        The map is kept in memory for the life of the fetcher and cached on disk
+        for PROJECT_CACHE_TTL. Once expired, the API is asked conditionally
+        (If-None-Match/If-Modified-Since) when the cached map fits in one page,
+        and a 304 reuses the cached map. If the API call fails, any cached copy
+        is used regardless of age.
+
+        Args:
+            use_cache: Return an in-memory or fresh on-disk map instead of calling the API
+
         Returns:
             Dictionary mapping project_id to project_name
         """
+        if use_cache and self._project_map is not None:
+            return self._project_map
+
+        project_map = self._fetch_project_metadata(use_cache)
+        if project_map:
+            self._project_map = project_map
+        return project_map
+
+    def _fetch_project_metadata(self, use_cache: bool) -> Dict[str, str]:
+        """
+        Load the project name map from the on-disk cache or the API.
+
+        Args:
+            use_cache: Return a fresh on-disk cache instead of calling the API
+
+        Returns:
+            Dictionary mapping project_id to project_name
+        """
+        self.project_metadata_from_cache = False
+        cached = self._load_project_cache()
+        if use_cache and cached is not None and datetime.now() - cached["fetched_at"] <= PROJECT_CACHE_TTL:
+            logger.info(f"Using cached metadata for {len(cached['projects'])} projects")
+            self.project_metadata_from_cache = True
+            return cached["projects"]
+
+        # Conditional request: lets the API answer 304 if nothing changed. Only
+        # page 1 is validated, so this is only safe when the cached map fits in
+        # one page (a 304 would otherwise hide projects added on later pages);
+        # a forced refresh is always unconditional
+        headers = {}
+        if use_cache and cached is not None and len(cached["projects"]) < self.project_page_limit:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
         url = f"{self.base_url}/projects"
-        headers = {
-            "Accept": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
         params = {
             "org_id": self.org_id,
-            "limit": 100
+            "limit": self.project_page_limit
         }
 
         logger.info("Fetching project metadata for names")
 
         try:
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
-            data = response.json()
+            projects = []
+            validators = {}
+            cursor = None
+
+            while True:
+                page_params = {**params, "cursor": cursor} if cursor else params
+                response = self.session.get(url, params=page_params, headers=headers)
+                response.raise_for_status()
+
+                if response.status_code == 304:
+                    logger.info(f"Project metadata unchanged, reusing cached metadata for {len(cached['projects'])} projects")
+                    self._save_project_cache(cached["projects"], etag=cached.get("etag"), last_modified=cached.get("last_modified"))
+                    return cached["projects"]
+
+                # Only the first page is requested conditionally; keep its validators
+                if not cursor:
+                    validators = {
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified")
+                    }
+                    headers = {}
+
+                data = _loads(response.content)
+
+                page = data.get("projects", [])
+                projects.extend(page)
+
+                # Follow the pagination cursor for orgs with more projects than one page
+                cursor = data.get("pagination", {}).get("cursor")
+                if not cursor or not page:
+                    break
 
-            projects = data.get("projects", [])
             logger.info(f"Metadata API returned {len(projects)} projects")
 
-            # Build lookup map: project_id -> project_name
+            # Build lookup map: project_id -> project_name (falls back to id)
             project_map = {
-                project.get("id"): project.get("name", project.get("id"))
+                project["id"]: project.get("name") or project["id"]
                 for project in projects
+                if "id" in project
             }
 
             logger.info(f"Retrieved metadata for {len(project_map)} projects")
@@ -104,14 +308,23 @@ class NeonCostFetcher:
                 # Log a sample to see the structure
                 sample = projects[0]
                 logger.debug(f"Sample project structure: id={sample.get('id')}, name={sample.get('name')}")
+
+            if project_map:
+                self._save_project_cache(project_map, **validators)
             return project_map
 
         except requests.exceptions.HTTPError as e:
             logger.warning(f"Failed to fetch project metadata: {e}")
-            return {}
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # ValueError covers an undecodable body
             logger.warning(f"Request failed for project metadata: {e}")
-            return {}
+
+        # Stale-if-error: fall back to any cached copy
+        if cached is not None:
+            logger.warning(f"Using stale cached metadata for {len(cached['projects'])} projects")
+            self.project_metadata_from_cache = True
+            return cached["projects"]
+        return {}
 
     def fetch_projects_with_consumption(self, date: datetime, from_date: datetime = None) -> List[Dict]:
         """
@@ -133,9 +346,16 @@ class NeonCostFetcher:
         to_time = (date + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
 
         url = f"{self.base_url}/consumption_history/v2/projects"
-        headers = {
-            "Accept": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
+
+        # Query is the same for every page; only the cursor changes.
+        # from_time/to_time are always midnight, so the time part is fixed
+        params = {
+            "limit": CONSUMPTION_PAGE_LIMIT,
+            "from": f"{from_time.year:04d}-{from_time.month:02d}-{from_time.day:02d}T00:00:00Z",
+            "to": f"{to_time.year:04d}-{to_time.month:02d}-{to_time.day:02d}T00:00:00Z",
+            "granularity": "daily",
+            "org_id": self.org_id,
+            "metrics": "compute_unit_seconds,root_branch_bytes_month,child_branch_bytes_month,public_network_transfer_bytes"
         }
 
         all_projects = []
@@ -144,22 +364,13 @@ class NeonCostFetcher:
         logger.info("Fetching projects with consumption data")
 
         while True:
-            params = {
-                "limit": 100,
-                "from": from_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                "to": to_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                "granularity": "daily",
-                "org_id": self.org_id,
-                "metrics": "compute_unit_seconds,root_branch_bytes_month,child_branch_bytes_month,public_network_transfer_bytes"
-            }
-
             if cursor:
                 params["cursor"] = cursor
 
             try:
-                response = requests.get(url, headers=headers, params=params)
+                response = self.session.get(url, params=params)
                 response.raise_for_status()
-                data = response.json()
+                data = _loads(response.content)
 
                 projects = data.get("projects", [])
                 all_projects.extend(projects)
@@ -200,22 +411,27 @@ class NeonCostFetcher:
         Returns:
             Dictionary with daily metrics
         """
-        # Build lookup from the v2 metrics array
-        metrics_lookup = {}
-        for m in daily_record.get("metrics", []):
-            metrics_lookup[m.get("metric_name")] = m.get("value", 0)
+        # Scan the v2 metrics array once for the four metrics we request
+        compute_seconds = root_branch_bytes = child_branch_bytes = public_transfer_bytes = 0
+        for m in daily_record.get("metrics", ()):
+            name = m.get("metric_name")
+            if name == "compute_unit_seconds":
+                compute_seconds = m.get("value", 0)
+            elif name == "root_branch_bytes_month":
+                root_branch_bytes = m.get("value", 0)
+            elif name == "child_branch_bytes_month":
+                child_branch_bytes = m.get("value", 0)
+            elif name == "public_network_transfer_bytes":
+                public_transfer_bytes = m.get("value", 0)
 
         return {
             "timeframe_start": daily_record.get("timeframe_start", ""),
             "timeframe_end": daily_record.get("timeframe_end", ""),
-            "compute_seconds": metrics_lookup.get("compute_unit_seconds", 0),
-            "storage_bytes": (
-                metrics_lookup.get("root_branch_bytes_month", 0)
-                + metrics_lookup.get("child_branch_bytes_month", 0)
-            ),
-            "root_branch_bytes": metrics_lookup.get("root_branch_bytes_month", 0),
-            "child_branch_bytes": metrics_lookup.get("child_branch_bytes_month", 0),
-            "public_transfer_bytes": metrics_lookup.get("public_network_transfer_bytes", 0),
+            "compute_seconds": compute_seconds,
+            "storage_bytes": root_branch_bytes + child_branch_bytes,
+            "root_branch_bytes": root_branch_bytes,
+            "child_branch_bytes": child_branch_bytes,
+            "public_transfer_bytes": public_transfer_bytes,
         }
 
     def calculate_monthly_transfer(self, projects: List[Dict], target_date: datetime) -> Dict[str, Dict]:
@@ -265,39 +481,38 @@ class NeonCostFetcher:
 
         return result
 
-    def calculate_daily_costs(self, metrics: Dict, date: datetime, prior_transfer_bytes: int = 0) -> Dict:
+    def calculate_daily_costs(self, metrics: Dict, days_in_month: int, prior_transfer_bytes: int = 0) -> Dict:
         """
         Calculate costs from daily metrics using Neon's usage-based pricing.
 
         Args:
             metrics: Daily metrics (from extract_daily_metrics)
-            date: Date for the calculation (used to determine days in month for storage proration)
+            days_in_month: Days in the billing month (for storage proration)
             prior_transfer_bytes: Cumulative public transfer for this project earlier
                                   in the month (before target day), used for free tier calc
 
         Returns:
             Dictionary with calculated daily costs and details
         """
-        days_in_month = calendar.monthrange(date.year, date.month)[1]
-        gb = Decimal("1073741824")
-        free_tier_gb = PRICING["data_transfer_free_gb_per_project"]
+        gb = BYTES_PER_GB
+        free_tier_gb = DATA_TRANSFER_FREE_GB_PER_PROJECT
 
         # 1. Compute cost - $0.222 per CU-hour
-        compute_hours = Decimal(str(metrics["compute_seconds"])) / Decimal("3600")
-        compute_cost = compute_hours * PRICING["compute_per_cu_hour"]
+        compute_hours = metrics["compute_seconds"] / 3600.0
+        compute_cost = compute_hours * COMPUTE_PER_CU_HOUR
 
         # 2. Storage cost - $0.35 per GB-month, prorated daily
-        storage_gb = Decimal(str(metrics["storage_bytes"])) / gb
-        storage_cost = (storage_gb * PRICING["storage_per_gb_month"]) / Decimal(str(days_in_month))
+        storage_gb = metrics["storage_bytes"] / gb
+        storage_cost = storage_gb * STORAGE_PER_GB_MONTH / days_in_month
 
         # 3. Data transfer (public egress) - $0.10/GB after 100GB free per project per month
-        public_transfer_gb = Decimal(str(metrics["public_transfer_bytes"])) / gb
-        prior_gb = Decimal(str(prior_transfer_bytes)) / gb
+        public_transfer_gb = metrics["public_transfer_bytes"] / gb
+        prior_gb = prior_transfer_bytes / gb
         total_cumulative_gb = prior_gb + public_transfer_gb
 
         if total_cumulative_gb <= free_tier_gb:
             # Still within free tier
-            billable_transfer_gb = Decimal("0")
+            billable_transfer_gb = 0.0
         elif prior_gb >= free_tier_gb:
             # Already exceeded free tier before today - all of today is billable
             billable_transfer_gb = public_transfer_gb
@@ -305,111 +520,104 @@ class NeonCostFetcher:
             # Crossed the threshold today - only the overage is billable
             billable_transfer_gb = total_cumulative_gb - free_tier_gb
 
-        data_transfer_cost = billable_transfer_gb * PRICING["data_transfer_per_gb"]
+        data_transfer_cost = billable_transfer_gb * DATA_TRANSFER_PER_GB
 
         return {
-            "compute_cost": float(compute_cost),
-            "storage_cost": float(storage_cost),
-            "data_transfer_cost": float(data_transfer_cost),
-            "compute_hours": float(compute_hours),
-            "storage_gb": float(storage_gb),
-            "public_transfer_gb": float(public_transfer_gb),
-            "billable_transfer_gb": float(billable_transfer_gb),
-            "monthly_cumulative_transfer_gb": float(total_cumulative_gb),
-            "compute_rate": float(PRICING["compute_per_cu_hour"]),
-            "storage_rate": float(PRICING["storage_per_gb_month"]),
-            "data_transfer_rate": float(PRICING["data_transfer_per_gb"]),
+            "compute_cost": compute_cost,
+            "storage_cost": storage_cost,
+            "data_transfer_cost": data_transfer_cost,
+            "compute_hours": compute_hours,
+            "storage_gb": storage_gb,
+            "public_transfer_gb": public_transfer_gb,
+            "billable_transfer_gb": billable_transfer_gb,
+            "monthly_cumulative_transfer_gb": total_cumulative_gb,
+            "compute_rate": PRICING["compute_per_cu_hour"],
+            "storage_rate": PRICING["storage_per_gb_month"],
+            "data_transfer_rate": PRICING["data_transfer_per_gb"],
             "days_in_month": days_in_month
         }
 
-    def convert_to_focus(self, costs: Dict, metrics: Dict, date: datetime, project: Dict = None) -> List[Dict]:
+    def build_project_tags(self, project_id: str, project_name: str) -> Dict[str, str]:
+        """
+        Build the per-project tags shared by all of a project's FOCUS records.
+
+        Args:
+            project_id: Neon project ID
+            project_name: Neon project name (format: <service>-<env>)
+
+        Returns:
+            Dictionary with project_id, project_name, service and env tags
+        """
+        # Parse service and env from project_name (format: <service>-<env>)
+        # Split on last hyphen to handle multi-part service names like "game-ops-stage";
+        # with no hyphen, use whole name as service, env unknown
+        service, separator, env = project_name.rpartition("-")
+
+        return {
+            "project_id": project_id,
+            "project_name": project_name,
+            "service": service if separator else project_name,
+            "env": env if separator else "unknown",
+        }
+
+    def convert_to_focus(self, costs: Dict, metrics: Dict, charge_date: str, project_tags: Dict = None) -> List[Dict]:
         """
         Convert calculated daily costs to FOCUS format records.
 
         Args:
             costs: Calculated daily costs dictionary
             metrics: Daily metrics dictionary (for operational context)
-            date: Billing date
-            project: Optional project dictionary with id, name, etc.
+            charge_date: Billing date (YYYY-MM-DD)
+            project_tags: Optional project tags (from build_project_tags)
 
         Returns:
-            List of FOCUS-format cost records (1-2 per day, depending on usage)
+            List of FOCUS-format cost records (1-3 per day, depending on usage)
         """
-        charge_date = date.strftime("%Y-%m-%d")
         focus_records = []
+        project_tags = project_tags or {}
 
-        # Build project tags if available
-        project_tags = {}
-        if project:
-            project_id = project.get("id", "unknown")
-            project_name = project.get("name", "unknown")
-
-            project_tags["project_id"] = project_id
-            project_tags["project_name"] = project_name
-
-            # Parse service and env from project_name (format: <service>-<env>)
-            # Split on last hyphen to handle multi-part service names like "game-ops-stage"
-            if "-" in project_name:
-                parts = project_name.rsplit("-", 1)
-                project_tags["service"] = parts[0]
-                project_tags["env"] = parts[1]
-            else:
-                # No hyphen, use whole name as service, env unknown
-                project_tags["service"] = project_name
-                project_tags["env"] = "unknown"
+        # Copy a template carrying the date fields rather than rebuilding each record
+        base_record = FOCUS_RECORD_TEMPLATE.copy()
+        base_record["ChargePeriodStart"] = charge_date
+        base_record["ChargePeriodEnd"] = charge_date
 
         # Record 1: Compute cost (only if > 0)
         if costs["compute_cost"] > 0:
-            focus_records.append({
-                "ProviderName": "Neon",
-                "ChargeDescription": "Compute",
-                "ChargePeriodStart": charge_date,
-                "ChargePeriodEnd": charge_date,
-                "BilledCost": costs["compute_cost"],
-                "BillingCurrency": "USD",
-                "Tags": {
-                    **project_tags,
-                    "charge_type": "compute",
-                    "compute_hours": f"{costs['compute_hours']:.4f}",
-                    "rate_per_cu_hour": str(costs["compute_rate"]),
-                }
-            })
+            record = base_record.copy()
+            record["ChargeDescription"] = "Compute"
+            record["BilledCost"] = costs["compute_cost"]
+            record["Tags"] = project_tags | {
+                "charge_type": "compute",
+                "compute_hours": f"{costs['compute_hours']:.4f}",
+                "rate_per_cu_hour": COMPUTE_RATE_TAG,
+            }
+            focus_records.append(record)
 
         # Record 2: Storage cost (only if > 0)
         if costs["storage_cost"] > 0:
-            focus_records.append({
-                "ProviderName": "Neon",
-                "ChargeDescription": "Storage",
-                "ChargePeriodStart": charge_date,
-                "ChargePeriodEnd": charge_date,
-                "BilledCost": costs["storage_cost"],
-                "BillingCurrency": "USD",
-                "Tags": {
-                    **project_tags,
-                    "charge_type": "storage",
-                    "storage_gb": f"{costs['storage_gb']:.2f}",
-                    "rate_per_gb_month": str(costs["storage_rate"]),
-                }
-            })
+            record = base_record.copy()
+            record["ChargeDescription"] = "Storage"
+            record["BilledCost"] = costs["storage_cost"]
+            record["Tags"] = project_tags | {
+                "charge_type": "storage",
+                "storage_gb": f"{costs['storage_gb']:.2f}",
+                "rate_per_gb_month": STORAGE_RATE_TAG,
+            }
+            focus_records.append(record)
 
         # Record 3: Data transfer cost (only if > 0)
         if costs["data_transfer_cost"] > 0:
-            focus_records.append({
-                "ProviderName": "Neon",
-                "ChargeDescription": "Data Transfer",
-                "ChargePeriodStart": charge_date,
-                "ChargePeriodEnd": charge_date,
-                "BilledCost": costs["data_transfer_cost"],
-                "BillingCurrency": "USD",
-                "Tags": {
-                    **project_tags,
-                    "charge_type": "data_transfer",
-                    "public_transfer_gb": f"{costs['public_transfer_gb']:.4f}",
-                    "billable_transfer_gb": f"{costs['billable_transfer_gb']:.4f}",
-                    "monthly_cumulative_gb": f"{costs['monthly_cumulative_transfer_gb']:.2f}",
-                    "rate_per_gb": str(costs["data_transfer_rate"]),
-                }
-            })
+            record = base_record.copy()
+            record["ChargeDescription"] = "Data Transfer"
+            record["BilledCost"] = costs["data_transfer_cost"]
+            record["Tags"] = project_tags | {
+                "charge_type": "data_transfer",
+                "public_transfer_gb": f"{costs['public_transfer_gb']:.4f}",
+                "billable_transfer_gb": f"{costs['billable_transfer_gb']:.4f}",
+                "monthly_cumulative_gb": f"{costs['monthly_cumulative_transfer_gb']:.2f}",
+                "rate_per_gb": DATA_TRANSFER_RATE_TAG,
+            }
+            focus_records.append(record)
 
         return focus_records
 
@@ -439,125 +647,175 @@ Examples:
     args = parser.parse_args()
 
     try:
-        # Initialize fetcher
-        fetcher = NeonCostFetcher()
-
-        # Initialize uploader (only needed for non-dry-run)
-        if not args.dry_run:
-            uploader = DatadogCostUploader()
-
-        # Determine target date (default to yesterday)
-        if args.date:
-            target_date = datetime.strptime(args.date, '%Y-%m-%d')
-        else:
-            target_date = datetime.now() - timedelta(days=1)
-
-        logger.info(f"Processing Neon costs for {target_date.strftime('%Y-%m-%d')}")
-
-        # Fetch project metadata (names) first
-        project_name_map = fetcher.fetch_project_metadata()
-        logger.info(f"Project name map contains {len(project_name_map)} entries")
-        if project_name_map:
-            logger.debug(f"Sample project names: {list(project_name_map.items())[:3]}")
-
-        # Fetch month-to-date consumption data (for cumulative transfer calculation)
-        month_start = target_date.replace(day=1)
-        projects = fetcher.fetch_projects_with_consumption(target_date, from_date=month_start)
-
-        if not projects:
-            logger.warning("No projects found in organization")
-            sys.exit(0)
-
-        # Calculate per-project month-to-date transfer for free tier logic
-        transfer_map = fetcher.calculate_monthly_transfer(projects, target_date)
-
-        # Process each project
-        all_focus_records = []
-        total_org_cost = Decimal("0")
-        projects_with_data = 0
-
-        for project in projects:
-            project_id = project.get("project_id")
-
-            # Skip projects not in our organization
-            if project_id not in project_name_map:
-                logger.debug(f"Skipping project {project_id} - not in organization")
-                continue
-
-            # Build project info dict for tagging
-            project_info = {
-                "id": project_id,
-                "name": project_name_map[project_id]
-            }
-
-            project_name = project_info["name"]
-            logger.debug(f"Processing project: {project_name} ({project_id})")
-
-            # Find the target day's consumption record from the month-to-date data
-            target_day_str = target_date.strftime("%Y-%m-%d")
-            daily_record = None
-            for period in project.get("periods", []):
-                for record in period.get("consumption", []):
-                    if record.get("timeframe_start", "").startswith(target_day_str):
-                        daily_record = record
+        # Clients close their pooled connections when the run ends
+        with ExitStack() as clients:
+            # Initialize fetcher
+            fetcher = clients.enter_context(NeonCostFetcher())
+
+            # Initialize uploader (only needed for non-dry-run)
+            if not args.dry_run:
+                uploader = clients.enter_context(DatadogCostUploader())
+
+            # Determine target date (default to yesterday)
+            if args.date:
+                target_date = datetime.strptime(args.date, '%Y-%m-%d')
+            else:
+                target_date = datetime.now() - timedelta(days=1)
+
+            logger.info(f"Processing Neon costs for {target_date.strftime('%Y-%m-%d')}")
+
+            # Fetch project metadata (names) and month-to-date consumption data
+            # (for cumulative transfer calculation) concurrently; they are independent
+            month_start = target_date.replace(day=1)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                metadata_future = executor.submit(fetcher.fetch_project_metadata)
+                consumption_future = executor.submit(
+                    fetcher.fetch_projects_with_consumption, target_date, from_date=month_start
+                )
+                project_name_map = metadata_future.result()
+                projects = consumption_future.result()
+
+            logger.info(f"Project name map contains {len(project_name_map)} entries")
+            if project_name_map:
+                logger.debug(f"Sample project names: {list(project_name_map.items())[:3]}")
+
+            if not projects:
+                logger.warning("No projects found in organization")
+                sys.exit(0)
+
+            # A cached name map may predate newly created projects; refresh it if so
+            if fetcher.project_metadata_from_cache and any(
+                project.get("project_id") not in project_name_map for project in projects
+            ):
+                logger.info("Consumption data includes projects missing from cached metadata, refreshing")
+                project_name_map = fetcher.fetch_project_metadata(use_cache=False) or project_name_map
+
+            # Calculate per-project month-to-date transfer for free tier logic
+            transfer_map = fetcher.calculate_monthly_transfer(projects, target_date)
+
+            # Billing date string, shared by every project's records
+            charge_date = target_date.strftime("%Y-%m-%d")
+
+            # Days in the billing month, for storage proration (same for every project)
+            days_in_month = calendar.monthrange(target_date.year, target_date.month)[1]
+
+            # Process each project
+            all_focus_records = []
+            total_org_cost = 0.0
+            projects_with_data = 0
+            records_generated = 0
+            # Per-project logs are debug-only; skip building their messages otherwise
+            debug_logging = logger.isEnabledFor(logging.DEBUG)
+            upload_batches = 0
+            upload_success = True
+
+            for project in projects:
+                project_id = project.get("project_id")
+
+                # Skip projects not in our organization
+                if project_id not in project_name_map:
+                    if debug_logging:
+                        logger.debug(f"Skipping project {project_id} - not in organization")
+                    continue
+
+                project_name = project_name_map[project_id]
+                if debug_logging:
+                    logger.debug(f"Processing project: {project_name} ({project_id})")
+
+                # Find the target day's consumption record from the month-to-date data
+                daily_record = None
+                for period in project.get("periods", []):
+                    for record in period.get("consumption", []):
+                        if record.get("timeframe_start", "").startswith(charge_date):
+                            daily_record = record
+                            break
+                    if daily_record:
                         break
-                if daily_record:
-                    break
-
-            if not daily_record:
-                continue
 
-            projects_with_data += 1
-
-            # Extract metrics for the target day
-            metrics = fetcher.extract_daily_metrics(daily_record)
-
-            # Get prior cumulative transfer for free tier calculation
-            prior_transfer = transfer_map.get(project_id, {}).get("prior_cumulative_bytes", 0)
-
-            # Calculate costs for the day
-            costs = fetcher.calculate_daily_costs(metrics, target_date, prior_transfer_bytes=prior_transfer)
-
-            # Track project total
-            project_cost = Decimal(str(costs["compute_cost"])) + Decimal(str(costs["storage_cost"])) + Decimal(str(costs["data_transfer_cost"]))
-            total_org_cost += project_cost
-
-            # Log project metrics at debug level
-            logger.debug(f"  {project_name}: Compute={costs['compute_hours']:.2f}h, Storage={costs['storage_gb']:.2f}GB, Transfer={costs['public_transfer_gb']:.2f}GB (cumulative={costs['monthly_cumulative_transfer_gb']:.2f}GB), Cost=${float(project_cost):.4f}")
-
-            # Convert to FOCUS format (generates 1-3 records per project)
-            focus_records = fetcher.convert_to_focus(costs, metrics, target_date, project_info)
-            all_focus_records.extend(focus_records)
-
-        logger.info(f"Total organization cost: ${float(total_org_cost):.4f}")
-        logger.info(f"Generated {len(all_focus_records)} total FOCUS records across {projects_with_data} projects with data")
-
-        # Handle dry-run mode
-        if args.dry_run:
-            logger.info("DRY RUN MODE - Not uploading to Datadog")
-            print("\n" + "="*80)
-            print("FOCUS COST RECORDS (would be uploaded to Datadog):")
-            print("="*80)
-            print(json.dumps(all_focus_records, indent=2))
-            print("="*80)
-
-            total_cost = sum(record["BilledCost"] for record in all_focus_records)
-            print(f"\nTotal daily cost: ${total_cost:.4f}")
-            print(f"FOCUS records generated: {len(all_focus_records)}")
-            print(f"Projects with data: {projects_with_data}")
-            print(f"Total projects: {len(projects)}")
-            logger.info("Dry run completed successfully")
-            sys.exit(0)
-
-        # Upload to Datadog
-        success = uploader.upload_costs(all_focus_records, provider_name="Neon")
-
-        if success:
-            logger.info("Neon cost data successfully uploaded to Datadog")
-            sys.exit(0)
-        else:
-            logger.error("Failed to upload Neon cost data to Datadog")
-            sys.exit(1)
+                if not daily_record:
+                    continue
+
+                projects_with_data += 1
+
+                # Extract metrics for the target day
+                metrics = fetcher.extract_daily_metrics(daily_record)
+
+                # Idle project (no usage at all): skip the cost math entirely
+                if not (metrics["compute_seconds"] or metrics["storage_bytes"] or metrics["public_transfer_bytes"]):
+                    if debug_logging:
+                        logger.debug(f"  {project_name}: no usage")
+                    continue
+
+                # Get prior cumulative transfer for free tier calculation
+                prior_transfer = transfer_map.get(project_id, {}).get("prior_cumulative_bytes", 0)
+
+                # Calculate costs for the day
+                costs = fetcher.calculate_daily_costs(metrics, days_in_month, prior_transfer_bytes=prior_transfer)
+
+                # Track project total
+                project_cost = costs["compute_cost"] + costs["storage_cost"] + costs["data_transfer_cost"]
+                total_org_cost += project_cost
+
+                # Log project metrics at debug level
+                if debug_logging:
+                    logger.debug(f"  {project_name}: Compute={costs['compute_hours']:.2f}h, Storage={costs['storage_gb']:.2f}GB, Transfer={costs['public_transfer_gb']:.2f}GB (cumulative={costs['monthly_cumulative_transfer_gb']:.2f}GB), Cost=${project_cost:.4f}")
+
+                # No billable usage (e.g. transfer still within the free tier): nothing to record
+                if project_cost == 0:
+                    continue
+
+                # Convert to FOCUS format (generates 1-3 records per project)
+                project_tags = fetcher.build_project_tags(project_id, project_name)
+                focus_records = fetcher.convert_to_focus(costs, metrics, charge_date, project_tags)
+                all_focus_records.extend(focus_records)
+                records_generated += len(focus_records)
+
+                # Upload in batches to bound memory (dry run keeps everything to print)
+                if not args.dry_run and len(all_focus_records) >= UPLOAD_BATCH_SIZE:
+                    upload_batches += 1
+                    upload_success &= uploader.upload_costs(
+                        all_focus_records, provider_name="Neon", batch=upload_batches if upload_batches > 1 else None
+                    )
+                    all_focus_records.clear()
+
+            logger.info(f"Total organization cost: ${total_org_cost:.4f}")
+            logger.info(f"Generated {records_generated} total FOCUS records across {projects_with_data} projects with data")
+
+            # Handle dry-run mode
+            if args.dry_run:
+                logger.info("DRY RUN MODE - Not uploading to Datadog")
+                print("\n" + "="*80)
+                print("FOCUS COST RECORDS (would be uploaded to Datadog):")
+                print("="*80)
+                _write_json_indented(all_focus_records)
+                print("="*80)
+
+                # total_org_cost already sums every record's BilledCost (zero costs emit no record)
+                print(f"\nTotal daily cost: ${total_org_cost:.4f}")
+                print(f"FOCUS records generated: {records_generated}")
+                print(f"Projects with data: {projects_with_data}")
+                print(f"Total projects: {len(projects)}")
+                logger.info("Dry run completed successfully")
+                sys.exit(0)
+
+            # Upload remaining records to Datadog (everything, if no batch filled up).
+            # Batch 1 keeps the unsuffixed Neon_<date>.json name and later batches
+            # add _batchN, so a re-run replaces the same files; higher-numbered
+            # files left by an earlier, larger run are not removed
+            if all_focus_records or not upload_batches:
+                upload_batches += 1
+                upload_success &= uploader.upload_costs(
+                    all_focus_records, provider_name="Neon", batch=upload_batches if upload_batches > 1 else None
+                )
+
+            if upload_success:
+                logger.info("Neon cost data successfully uploaded to Datadog")
+                sys.exit(0)
+            else:
+                # Batches that did upload are already in Datadog; only a full re-run
+                # replaces them consistently
+                logger.error(f"Failed to upload Neon cost data to Datadog; re-run {charge_date} in full to replace every batch")
+                sys.exit(1)
 
     except Exception as e:
         logger.error(f"Neon cost processing failed: {e}")